@@ -0,0 +1,72 @@
+"""Import-time benchmark for the consult agent CLI.
+
+Times `import consult_agent` in fresh interpreters and checks that the heavy
+dependencies (anthropic, requests, dotenv) are not pulled in at import time.
+Exits non-zero on a regression so it can gate CI.
+
+Usage:
+    python bench_startup.py [--runs N] [--budget-ms MS]
+"""
+
+import argparse
+import json
+import statistics
+import subprocess
+import sys
+
+MODULES = ["consult_agent", "fhir_client", "prompts", "triage_rules", "note_sections", "bulk_store", "notifications", "export_case"]
+HEAVY_MODULES = ["anthropic", "requests", "dotenv", "httpx"]
+
+PROBE = """\
+import json, sys, time
+t0 = time.perf_counter()
+import {module}
+elapsed = time.perf_counter() - t0
+heavy = [m for m in {heavy!r} if m in sys.modules]
+print(json.dumps({{"ms": elapsed * 1000, "heavy": heavy}}))
+"""
+
+
+def time_import(module, runs):
+    """Import `module` in `runs` fresh interpreters; return (timings_ms, heavy_modules)."""
+    timings = []
+    heavy = set()
+    for _ in range(runs):
+        out = subprocess.run(
+            [sys.executable, "-c", PROBE.format(module=module, heavy=HEAVY_MODULES)],
+            capture_output=True,
+            text=True,
+            check=True,
+        )
+        result = json.loads(out.stdout.strip().splitlines()[-1])
+        timings.append(result["ms"])
+        heavy.update(result["heavy"])
+    return timings, sorted(heavy)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--runs", type=int, default=10)
+    parser.add_argument("--budget-ms", type=float, default=50.0,
+                        help="fail if the median import time exceeds this")
+    args = parser.parse_args()
+
+    failed = False
+    for module in MODULES:
+        timings, heavy = time_import(module, args.runs)
+        median = statistics.median(timings)
+        status = "ok"
+        if heavy:
+            status = f"FAIL — eagerly imports {', '.join(heavy)}"
+            failed = True
+        elif median > args.budget_ms:
+            status = f"FAIL — over {args.budget_ms:.0f} ms budget"
+            failed = True
+        print(f"{module:<16} median {median:7.2f} ms  "
+              f"(min {min(timings):.2f}, max {max(timings):.2f})  {status}")
+
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,326 @@
+"""Ingest FHIR Bulk Data ($export) NDJSON into a local SQLite chart store.
+
+For unit-wide work (morning census, QA review, batch triage) pulling patients
+one at a time through fhir_client doesn't scale. This streams Observation,
+Condition and MedicationRequest NDJSON — from local files or a bulk export
+server — into SQLite indexed by patient and time. `pull_full_chart(patient_id,
+store=ChartStore(...))` then reads those resources locally.
+
+Usage:
+    python bulk_store.py export_dir/ [--db chart_store.db]
+    python bulk_store.py --server http://localhost:8080/fhir [--db chart_store.db]
+"""
+
+import argparse
+import glob
+import json
+import os
+import pathlib
+import sqlite3
+import time
+from datetime import datetime, timezone
+
+from fhir_client import HEADERS, format_condition, format_observation, medication_entry, split_medications
+
+DEFAULT_DB = "chart_store.db"
+RESOURCE_TYPES = ["Observation", "Condition", "MedicationRequest"]
+BATCH_SIZE = 1000
+NDJSON_HEADERS = {"Accept": "application/fhir+ndjson"}
+
+SCHEMA = """\
+CREATE TABLE IF NOT EXISTS observations (
+    id TEXT PRIMARY KEY,
+    patient_id TEXT NOT NULL,
+    category TEXT,
+    status TEXT,
+    effective TEXT,
+    display TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS observations_patient_time
+    ON observations (patient_id, category, effective DESC);
+
+CREATE TABLE IF NOT EXISTS conditions (
+    id TEXT PRIMARY KEY,
+    patient_id TEXT NOT NULL,
+    clinical_status TEXT,
+    recorded TEXT,
+    display TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS conditions_patient_time
+    ON conditions (patient_id, recorded DESC);
+
+CREATE TABLE IF NOT EXISTS medication_requests (
+    id TEXT PRIMARY KEY,
+    patient_id TEXT NOT NULL,
+    status TEXT,
+    category TEXT,
+    authored TEXT,
+    display TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS medication_requests_patient_time
+    ON medication_requests (patient_id, authored DESC);
+
+CREATE TABLE IF NOT EXISTS metadata (
+    key TEXT PRIMARY KEY,
+    value TEXT
+);
+"""
+
+
+def _patient_id(r):
+    """Patient id from a resource's subject/patient reference ("Patient/123" → "123")."""
+    ref = (r.get("subject") or r.get("patient") or {}).get("reference", "")
+    return ref.rsplit("/", 1)[-1]
+
+
+def _first_code(concepts):
+    for concept in concepts:
+        for coding in concept.get("coding", []):
+            if coding.get("code"):
+                return coding["code"]
+    return ""
+
+
+def _utc(timestamp):
+    """Normalise a FHIR dateTime to UTC ISO 8601 so stored times sort correctly.
+
+    Dates and times without an offset are returned unchanged.
+    """
+    try:
+        parsed = datetime.fromisoformat(timestamp.replace("Z", "+00:00"))
+    except ValueError:
+        return timestamp
+    if parsed.tzinfo is None:
+        return timestamp
+    return parsed.astimezone(timezone.utc).isoformat(timespec="microseconds")
+
+
+def _observation_row(r):
+    effective = (r.get("effectiveDateTime")
+                 or r.get("effectivePeriod", {}).get("start")
+                 or r.get("issued", ""))
+    return ("observations",
+            (r["id"], _patient_id(r), _first_code(r.get("category", [])),
+             r.get("status", ""), _utc(effective), format_observation(r)))
+
+
+def _condition_row(r):
+    display = format_condition(r)
+    if not display:
+        return None
+    recorded = r.get("recordedDate") or r.get("onsetDateTime", "")
+    return ("conditions",
+            (r["id"], _patient_id(r), _first_code([r.get("clinicalStatus", {})]),
+             _utc(recorded), display))
+
+
+def _medication_row(r):
+    med_text, category = medication_entry(r)
+    return ("medication_requests",
+            (r["id"], _patient_id(r), r.get("status", ""), category,
+             _utc(r.get("authoredOn", "")), med_text))
+
+
+_ROW_BUILDERS = {
+    "Observation": _observation_row,
+    "Condition": _condition_row,
+    "MedicationRequest": _medication_row,
+}
+
+_INSERTS = {
+    "observations": "INSERT OR REPLACE INTO observations VALUES (?, ?, ?, ?, ?, ?)",
+    "conditions": "INSERT OR REPLACE INTO conditions VALUES (?, ?, ?, ?, ?)",
+    "medication_requests": "INSERT OR REPLACE INTO medication_requests VALUES (?, ?, ?, ?, ?, ?)",
+}
+
+
+class ChartStore:
+    """SQLite-backed store of bulk-exported chart resources."""
+
+    def __init__(self, path=DEFAULT_DB, readonly=False):
+        """Open (or create) the store at `path`.
+
+        With `readonly=True` the file must already exist — a mistyped path
+        raises instead of silently creating an empty store.
+        """
+        # check_same_thread=False: run_consult pulls the chart on a worker thread.
+        if readonly:
+            if not os.path.exists(path):
+                raise FileNotFoundError(f"Chart store not found: {path}")
+            uri = pathlib.Path(path).resolve().as_uri() + "?mode=ro"
+            self.conn = sqlite3.connect(uri, uri=True, check_same_thread=False)
+        else:
+            self.conn = sqlite3.connect(path, check_same_thread=False)
+            self.conn.executescript(SCHEMA)
+
+    def close(self):
+        self.conn.close()
+
+    # --- Ingestion ---
+
+    def ingest_lines(self, lines):
+        """Stream NDJSON lines into the store; return {resource_type: count}.
+
+        Resource types other than RESOURCE_TYPES are skipped. Rows are written
+        in batches inside a single transaction.
+        """
+        counts = {}
+        pending = {table: [] for table in _INSERTS}
+        with self.conn:
+            for line in lines:
+                if isinstance(line, bytes):
+                    line = line.decode("utf-8")
+                line = line.strip()
+                if not line:
+                    continue
+                r = json.loads(line)
+                builder = _ROW_BUILDERS.get(r.get("resourceType"))
+                row = builder(r) if builder else None
+                if row is None or not row[1][1]:
+                    continue
+                table, values = row
+                pending[table].append(values)
+                counts[r["resourceType"]] = counts.get(r["resourceType"], 0) + 1
+                if len(pending[table]) >= BATCH_SIZE:
+                    self.conn.executemany(_INSERTS[table], pending[table])
+                    pending[table].clear()
+            for table, rows in pending.items():
+                if rows:
+                    self.conn.executemany(_INSERTS[table], rows)
+        return counts
+
+    def ingest_file(self, path):
+        """Ingest one local NDJSON file."""
+        with open(path, encoding="utf-8") as f:
+            return self.ingest_lines(f)
+
+    def ingest_directory(self, directory):
+        """Ingest every *.ndjson file in `directory`.
+
+        The newest file's modification time is recorded as the export time.
+        """
+        totals = {}
+        newest = None
+        for path in sorted(glob.glob(os.path.join(directory, "*.ndjson"))):
+            for rtype, n in self.ingest_file(path).items():
+                totals[rtype] = totals.get(rtype, 0) + n
+            newest = max(newest or 0, os.path.getmtime(path))
+        if newest is not None:
+            self.set_exported_at(datetime.fromtimestamp(newest, timezone.utc).isoformat())
+        return totals
+
+    def ingest_manifest(self, manifest, headers=None):
+        """Stream every output file listed in a completed $export manifest."""
+        import requests
+
+        totals = {}
+        for output in manifest.get("output", []):
+            if output.get("type") not in RESOURCE_TYPES:
+                continue
+            with requests.get(output["url"], headers=headers or NDJSON_HEADERS, stream=True) as resp:
+                resp.raise_for_status()
+                for rtype, n in self.ingest_lines(resp.iter_lines()).items():
+                    totals[rtype] = totals.get(rtype, 0) + n
+        if manifest.get("transactionTime"):
+            self.set_exported_at(manifest["transactionTime"])
+        return totals
+
+    # --- Metadata ---
+
+    def set_exported_at(self, timestamp):
+        with self.conn:
+            self.conn.execute(
+                "INSERT OR REPLACE INTO metadata VALUES ('exported_at', ?)", (timestamp,))
+
+    def exported_at(self):
+        """When the ingested data was exported (ISO 8601), or None if unknown."""
+        try:
+            row = self.conn.execute(
+                "SELECT value FROM metadata WHERE key = 'exported_at'").fetchone()
+        except sqlite3.OperationalError:  # store built before metadata was tracked
+            return None
+        return row[0] if row else None
+
+    def has_patient(self, patient_id):
+        """True if the store holds any rows for `patient_id`."""
+        for table in _INSERTS:
+            row = self.conn.execute(
+                f"SELECT 1 FROM {table} WHERE patient_id = ? LIMIT 1", (patient_id,)).fetchone()
+            if row:
+                return True
+        return False
+
+    # --- Chart reads (same shapes as the fhir_client get_* functions) ---
+
+    def get_conditions(self, patient_id):
+        rows = self.conn.execute(
+            "SELECT display FROM conditions WHERE patient_id = ? AND clinical_status = 'active' "
+            "ORDER BY recorded DESC", (patient_id,))
+        return [display for (display,) in rows]
+
+    def _observations(self, patient_id, category, limit):
+        rows = self.conn.execute(
+            "SELECT display FROM observations WHERE patient_id = ? AND category = ? "
+            "ORDER BY effective DESC LIMIT ?", (patient_id, category, limit))
+        return [display for (display,) in rows]
+
+    def get_vitals(self, patient_id):
+        return self._observations(patient_id, "vital-signs", 20)
+
+    def get_labs(self, patient_id):
+        return self._observations(patient_id, "laboratory", 50)
+
+    def get_medications(self, patient_id):
+        rows = self.conn.execute(
+            "SELECT display, category FROM medication_requests WHERE patient_id = ? "
+            "AND status = 'active' ORDER BY authored DESC", (patient_id,))
+        return split_medications(rows)
+
+
+def run_export(base_url, poll_interval=2.0, timeout=600):
+    """Kick off a system-level $export and poll until the manifest is ready."""
+    import requests
+
+    resp = requests.get(
+        f"{base_url}/$export",
+        params={"_type": ",".join(RESOURCE_TYPES)},
+        headers={**HEADERS, "Prefer": "respond-async"},
+    )
+    resp.raise_for_status()
+    status_url = resp.headers["Content-Location"]
+
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        status = requests.get(status_url, headers={"Accept": "application/json"})
+        status.raise_for_status()
+        if status.status_code == 200:
+            return status.json()
+        wait = status.headers.get("Retry-After", "")
+        time.sleep(float(wait) if wait.isdigit() else poll_interval)
+    raise TimeoutError(f"$export did not complete within {timeout}s")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    source = parser.add_mutually_exclusive_group(required=True)
+    source.add_argument("directory", nargs="?", help="directory of *.ndjson files")
+    source.add_argument("--server", help="FHIR base URL that supports $export")
+    parser.add_argument("--db", default=DEFAULT_DB)
+    args = parser.parse_args()
+
+    store = ChartStore(args.db)
+    start = time.perf_counter()
+    if args.server:
+        counts = store.ingest_manifest(run_export(args.server))
+    else:
+        counts = store.ingest_directory(args.directory)
+    elapsed = time.perf_counter() - start
+    store.close()
+
+    for rtype, n in sorted(counts.items()):
+        print(f"  {rtype}: {n}")
+    print(f"Ingested {sum(counts.values())} resources into {args.db} in {elapsed:.1f}s")
+
+
+if __name__ == "__main__":
+    main()
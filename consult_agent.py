@@ -6,28 +6,63 @@ Built by Christopher Stephenson, MD
 
 import json
 import os
-from dotenv import load_dotenv
-from anthropic import Anthropic
+from concurrent.futures import ThreadPoolExecutor
 from fhir_client import pull_full_chart, format_chart_for_ai
+from note_sections import parse_note, assemble_note, section_keys, parse_section_list, replace_section
+from triage_rules import find_red_flags, parse_acuity, expected_acuity, acuity_disagrees
 from prompts import (
     SYSTEM_PROMPT,
     TRIAGE_PROMPT,
     CONTEXT_PROMPT,
     PLAN_PROMPT,
     NOTE_PROMPT,
+    NOTE_ROUTER_PROMPT,
+    NOTE_SECTION_PROMPT,
 )
 
-load_dotenv()
-
-client = Anthropic(api_key=os.getenv("ANTHROPIC_API_KEY"))
 MODEL = "claude-sonnet-4-20250514"
+FAST_MODEL = "claude-3-5-haiku-20241022"
+
+# Per-stage routing. TRIAGE and CONTEXT are short and time-critical, so they
+# go to the fast model; PLAN and NOTE need the larger model's reasoning.
+STAGE_CONFIG = {
+    "triage": {"model": FAST_MODEL, "max_tokens": 1024},
+    "context": {"model": FAST_MODEL, "max_tokens": 1536},
+    "plan": {"model": MODEL, "max_tokens": 4096},
+    "note": {"model": MODEL, "max_tokens": 4096},
+    "note_router": {"model": FAST_MODEL, "max_tokens": 128},
+    "note_section": {"model": MODEL, "max_tokens": 1024},
+}
+
+_client = None
+
+
+def get_client():
+    """Return the shared Anthropic client, building it on first use.
+
+    `anthropic` and `dotenv` are imported here rather than at module level so
+    the CLI (and anything importing this module) starts without paying for them.
+    """
+    global _client
+    if _client is None:
+        from dotenv import load_dotenv
+        from anthropic import Anthropic
+
+        load_dotenv()
+        _client = Anthropic(api_key=os.getenv("ANTHROPIC_API_KEY"))
+    return _client
 
 
-def call_claude(system, user_message):
-    """Send a message to Claude and return the response text."""
-    response = client.messages.create(
-        model=MODEL,
-        max_tokens=4096,
+def call_claude(system, user_message, stage, escalate=False):
+    """Send a message to Claude and return the response text.
+
+    `stage` selects the model and max_tokens from STAGE_CONFIG; `escalate`
+    forces the larger MODEL regardless of the stage's default.
+    """
+    config = STAGE_CONFIG[stage]
+    response = get_client().messages.create(
+        model=MODEL if escalate else config["model"],
+        max_tokens=config["max_tokens"],
         system=system,
         messages=[{"role": "user", "content": user_message}],
     )
@@ -52,15 +87,90 @@ def print_header(text):
     print(f"{'='*60}\n")
 
 
+def revise_note(note, correction, consult_message, chart_text, resident_input):
+    """Apply a resident correction to the NOTE, regenerating only affected sections.
+
+    A fast router call picks the sections the correction touches; each is
+    rewritten with NOTE_SECTION_PROMPT and the rest are reused verbatim. Falls
+    back to a full NOTE_PROMPT regeneration if the note or the router's reply
+    can't be parsed; if the router finds nothing to change, the note is kept.
+    """
+    sections = parse_note(note)
+    keys = section_keys(sections)
+    affected = None
+    if keys:
+        router_reply = call_claude(
+            system=SYSTEM_PROMPT,
+            user_message=NOTE_ROUTER_PROMPT.format(
+                correction=correction,
+                section_list="\n".join(f"- {k}" for k in keys),
+                note=note,
+            ),
+            stage="note_router",
+        )
+        affected = parse_section_list(router_reply, sections)
+
+    if affected == []:
+        print("No sections affected — note unchanged.\n")
+        return note
+
+    if affected is None:
+        print("Regenerating full note...\n")
+        return call_claude(
+            system=SYSTEM_PROMPT,
+            user_message=NOTE_PROMPT.format(
+                consult_message=consult_message,
+                chart_data=chart_text,
+                resident_input=resident_input,
+            ),
+            stage="note",
+        )
+
+    print(f"Updating: {', '.join(affected)}...\n")
+    current = {s["key"]: s["text"] for s in sections}
+
+    def rewrite(key):
+        return call_claude(
+            system=SYSTEM_PROMPT,
+            user_message=NOTE_SECTION_PROMPT.format(
+                consult_message=consult_message,
+                chart_data=chart_text,
+                resident_input=resident_input,
+                note=note,
+                section=key,
+                correction=correction,
+                section_text=current[key],
+            ),
+            stage="note_section",
+        )
+
+    with ThreadPoolExecutor(max_workers=len(affected)) as executor:
+        rewritten = list(executor.map(rewrite, affected))
+    for key, text in zip(affected, rewritten):
+        sections = replace_section(sections, key, text)
+    return assemble_note(sections)
+
+
+def save_session(session, directory):
+    """Write a completed consult session to `directory` as timestamped JSON."""
+    from datetime import datetime
+
+    os.makedirs(directory, exist_ok=True)
+    path = os.path.join(directory, f"consult_{datetime.now():%Y%m%d_%H%M%S}.json")
+    with open(path, "w") as f:
+        json.dump(session, f, indent=2, ensure_ascii=False)
+    print(f"Session saved to {path}")
+    return path
+
+
 def run_consult():
     """Run the surgical consult workflow."""
+    from dotenv import load_dotenv
 
-    print_header("SURGICAL CONSULT AGENT")
-    print("Paste the consult page info below.")
-    print("Include the patient MRN and consult message.\n")
+    # Load .env up front so CHART_STORE / NOTIFY_* are seen; anthropic stays lazy.
+    load_dotenv()
 
-    # --- Input: consult page ---
-    consult_message = get_input("Consult message >> ")
+    print_header("SURGICAL CONSULT AGENT")
 
     # --- Load patient from FHIR ---
     # For demo, use the pre-loaded patient. In production, would search by MRN.
@@ -72,83 +182,185 @@ def run_consult():
     else:
         patient_id = input("Enter FHIR Patient ID: ").strip()
 
-    print("\n⏳ Pulling patient chart from EHR...\n")
-    chart_data = pull_full_chart(patient_id)
+    # Read observations/conditions/meds from a bulk-export store if configured.
+    store = None
+    if os.getenv("CHART_STORE"):
+        from bulk_store import ChartStore
+        store = ChartStore(os.getenv("CHART_STORE"), readonly=True)
+        if store.has_patient(patient_id):
+            print(f"Using chart store {os.getenv('CHART_STORE')} "
+                  f"(exported {store.exported_at() or 'at an unknown time'}) — "
+                  f"labs and vitals may be stale.\n")
+        else:
+            print(f"⚠️  Patient {patient_id} is not in the chart store; pulling live from the EHR.\n")
+
+    # Start the chart pull now so it runs while the resident types the page.
+    executor = ThreadPoolExecutor(max_workers=1)
+    chart_future = executor.submit(pull_full_chart, patient_id, store)
+    executor.shutdown(wait=False)
+
+    print("Paste the consult page info below.")
+    print("Include the patient MRN and consult message.\n")
+
+    # --- Input: consult page ---
+    consult_message = get_input("Consult message >> ")
+
+    if not chart_future.done():
+        print("\n⏳ Pulling patient chart from EHR...\n")
+    try:
+        chart_data = chart_future.result()
+    finally:
+        if store is not None:
+            store.close()
     chart_text = format_chart_for_ai(chart_data)
 
     print(chart_text)
     print_header("CHART DATA LOADED")
 
-    # --- Stage 1: Triage ---
-    print_header("TRIAGE ANALYSIS")
-    print("Analyzing acuity and red flags...\n")
+    # --- Critical-result notifications (optional) ---
+    sessions = None
+    if os.getenv("NOTIFY_PORT"):
+        from notifications import ConsultSessions, NOTIFY_PATH, start_receiver, subscribe, unsubscribe
 
-    triage = call_claude(
-        system=SYSTEM_PROMPT,
-        user_message=TRIAGE_PROMPT.format(
-            consult_message=consult_message,
-            chart_data=chart_text,
-        ),
-    )
-    print(triage)
+        port = int(os.getenv("NOTIFY_PORT"))
+        sessions = ConsultSessions()
+        sessions.open(patient_id, chart_data)
+        try:
+            receiver = start_receiver(sessions, port=port)
+        except OSError as e:
+            print(f"⚠️  Could not listen on port {port} ({e}); "
+                  f"continuing without result notifications.\n")
+            sessions = None
+    if sessions:
+        endpoint = os.getenv("NOTIFY_ENDPOINT", f"http://localhost:{port}{NOTIFY_PATH}")
+        try:
+            subscription_ids = subscribe(patient_id, endpoint)
+        except Exception as e:
+            print(f"⚠️  Could not register FHIR Subscriptions ({e}); "
+                  f"still listening on {endpoint}.\n")
+            subscription_ids = []
 
-    # --- Stage 2: Treatment Context & Gaps ---
-    print_header("TREATMENT CONTEXT & GAPS")
-    print("Analyzing current management and missing info...\n")
+    # Everything after subscribe() runs under try/finally so the remote
+    # Subscriptions are removed even on an error or Ctrl-C.
+    try:
+        # --- Stage 1: Triage ---
+        print_header("TRIAGE ANALYSIS")
+        print("Analyzing acuity and red flags...\n")
 
-    context = call_claude(
-        system=SYSTEM_PROMPT,
-        user_message=CONTEXT_PROMPT.format(
+        triage_message = TRIAGE_PROMPT.format(
             consult_message=consult_message,
             chart_data=chart_text,
-        ),
-    )
-    print(context)
+        )
+        triage = call_claude(system=SYSTEM_PROMPT, user_message=triage_message, stage="triage")
 
-    # --- Resident input ---
-    print_header("YOUR INPUT")
-    print("You've seen the triage and gaps analysis.")
-    print("Add anything from your exam, patient interview, or corrections.")
-    print("(Type your input, then press Enter twice to submit)\n")
+        # Escalate to the larger model if the chart's red flags support a higher
+        # acuity than the fast model called (or it made no call at all).
+        red_flags = find_red_flags(chart_data)
+        escalate = acuity_disagrees(triage, red_flags)
+        if escalate:
+            labels = ", ".join(f["label"] for f in red_flags) or "none"
+            print(f"⚠️  Fast-model acuity ({parse_acuity(triage) or 'not stated'}) is below "
+                  f"chart red flags ({expected_acuity(red_flags)}: {labels}).")
+            print(f"Re-running triage on {MODEL}...\n")
+            triage = call_claude(
+                system=SYSTEM_PROMPT, user_message=triage_message, stage="triage", escalate=True
+            )
+        print(triage)
 
-    resident_input = get_input(">> ")
+        # --- Stage 2: Treatment Context & Gaps ---
+        print_header("TREATMENT CONTEXT & GAPS")
+        print("Analyzing current management and missing info...\n")
 
-    # --- Stage 3: Assessment & Plan ---
-    print_header("ASSESSMENT & PLAN")
-    print("Generating evidence-based plan...\n")
+        context = call_claude(
+            system=SYSTEM_PROMPT,
+            user_message=CONTEXT_PROMPT.format(
+                consult_message=consult_message,
+                chart_data=chart_text,
+            ),
+            stage="context",
+            escalate=escalate,
+        )
+        print(context)
 
-    plan = call_claude(
-        system=SYSTEM_PROMPT,
-        user_message=PLAN_PROMPT.format(
-            consult_message=consult_message,
-            chart_data=chart_text,
-            resident_input=resident_input,
-        ),
-    )
-    print(plan)
+        # --- Resident input ---
+        print_header("YOUR INPUT")
+        print("You've seen the triage and gaps analysis.")
+        print("Add anything from your exam, patient interview, or corrections.")
+        print("(Type your input, then press Enter twice to submit)\n")
+
+        resident_input = get_input(">> ")
+
+        if sessions:
+            chart_text = format_chart_for_ai(sessions.snapshot(patient_id))
+
+        # --- Stage 3: Assessment & Plan ---
+        print_header("ASSESSMENT & PLAN")
+        print("Generating evidence-based plan...\n")
 
-    # --- Stage 4: Final Outputs ---
-    print_header("GENERATING FINAL OUTPUTS")
+        plan = call_claude(
+            system=SYSTEM_PROMPT,
+            user_message=PLAN_PROMPT.format(
+                consult_message=consult_message,
+                chart_data=chart_text,
+                resident_input=resident_input,
+            ),
+            stage="plan",
+        )
+        print(plan)
 
-    print("Any final corrections before generating the note?")
-    print("(Press Enter twice to skip, or type corrections)\n")
-    final_corrections = get_input(">> ")
-    combined_input = resident_input
-    if final_corrections:
-        combined_input += "\n\nAdditional corrections:\n" + final_corrections
+        if sessions:
+            chart_text = format_chart_for_ai(sessions.snapshot(patient_id))
 
-    note = call_claude(
-        system=SYSTEM_PROMPT,
-        user_message=NOTE_PROMPT.format(
+        # --- Stage 4: Final Outputs ---
+        print_header("GENERATING FINAL OUTPUTS")
+
+        note_message = NOTE_PROMPT.format(
             consult_message=consult_message,
             chart_data=chart_text,
-            resident_input=combined_input,
-        ),
-    )
-    print(note)
+            resident_input=resident_input,
+        )
+        note = call_claude(system=SYSTEM_PROMPT, user_message=note_message, stage="note")
+        print(note)
+
+        # --- Corrections: regenerate only the affected sections ---
+        while True:
+            print_header("CORRECTIONS")
+            print("Any final corrections to the note?")
+            print("(Press Enter twice to finish, or type corrections)\n")
+            final_corrections = get_input(">> ")
+            if not final_corrections:
+                break
+            if sessions:
+                chart_text = format_chart_for_ai(sessions.snapshot(patient_id))
+            resident_input += "\n\nAdditional corrections:\n" + final_corrections
+            note = revise_note(note, final_corrections, consult_message, chart_text, resident_input)
+            print(note)
+
+        if sessions:
+            chart_data = sessions.snapshot(patient_id)
+    finally:
+        if sessions:
+            try:
+                unsubscribe(subscription_ids)
+            except Exception as e:
+                print(f"⚠️  Could not remove FHIR Subscriptions {subscription_ids} ({e}).")
+            sessions.close(patient_id)
+            receiver.shutdown()
 
     print_header("CONSULT COMPLETE")
 
+    session = {
+        "consult_message": consult_message,
+        "resident_input": resident_input,
+        "chart": chart_data,
+        "chart_text": chart_text,
+        "stages": {"triage": triage, "context": context, "plan": plan, "note": note},
+    }
+    # Saved sessions feed export_case.py for the web demo.
+    if os.getenv("CONSULT_SESSION_DIR"):
+        save_session(session, os.getenv("CONSULT_SESSION_DIR"))
+    return session
+
 
 if __name__ == "__main__":
     run_consult()
@@ -0,0 +1,156 @@
+"""Export a completed consult session as a chunked, precompressed web demo case.
+
+Input is a session JSON as saved by run_consult (CONSULT_SESSION_DIR): the
+consult message, resident input, chart dict, formatted chart text and the
+four stage outputs. The older single-file web/cases/*.json have the same
+shape and can be used as input too.
+
+Output is a directory the demo page loads piece by piece:
+
+    manifest.json        case metadata + chunk index
+    chart.json           chart dict + chart_text
+    triage.json          {"text": ...} for each stage
+    context.json
+    plan.json
+    note.json
+
+Every chunk also gets a .gz variant, which the demo page fetches and
+decompresses itself (checked against the manifest sha256), and a .br variant
+if the optional `brotli` package is installed, for servers with brotli_static.
+
+Usage:
+    python export_case.py session.json web/cases/case3 [--title ... --description ... --impression ...]
+"""
+
+import argparse
+import gzip
+import hashlib
+import json
+import os
+import re
+
+from triage_rules import parse_acuity, expected_acuity, find_red_flags, parse_measurement
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+STAGES = ["triage", "context", "plan", "note"]
+ACUITY_COLORS = {"URGENT": "red", "SEMI-URGENT": "yellow", "ROUTINE": "green"}
+MANIFEST_VERSION = 1
+
+
+def _latest(chart, key):
+    """Most recent value of a triage_rules measurement key, formatted, or None."""
+    for line in chart.get("vitals", []) + chart.get("labs", []):
+        for measure, value in parse_measurement(line):
+            if measure == key:
+                return f"{value:g}"
+    return None
+
+
+def derive_key_findings(session, impression=""):
+    """Build the key-findings banner from the triage output and chart vitals."""
+    chart = session["chart"]
+    acuity = (parse_acuity(session["stages"]["triage"])
+              or expected_acuity(find_red_flags(chart)))
+
+    parts = []
+    for line in chart.get("vitals", []):
+        bp = re.search(r"Systolic:\s*([\d.]+).*Diastolic:\s*([\d.]+)", line)
+        if bp:
+            parts.append(f"BP {float(bp.group(1)):g}/{float(bp.group(2)):g}")
+            break
+    for label, key, unit in [("HR", "hr", ""), ("Temp", "temp", "°C"), ("Lac", "lactate", "")]:
+        value = _latest(chart, key)
+        if value is not None:
+            parts.append(f"{label} {value}{unit}")
+
+    return {
+        "acuity": acuity,
+        "acuity_color": ACUITY_COLORS[acuity],
+        "vitals_summary": " | ".join(parts),
+        "impression": impression,
+    }
+
+
+def _write_chunk(out_dir, name, payload):
+    """Write one JSON chunk plus its compressed variants; return its manifest entry."""
+    data = json.dumps(payload, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+    path = f"{name}.json"
+    with open(os.path.join(out_dir, path), "wb") as f:
+        f.write(data)
+
+    variants = {"gzip": (".gz", gzip.compress(data, compresslevel=9, mtime=0))}
+    if brotli is not None:
+        variants["br"] = (".br", brotli.compress(data, quality=11))
+
+    encodings = {}
+    for encoding, (suffix, compressed) in variants.items():
+        with open(os.path.join(out_dir, path + suffix), "wb") as f:
+            f.write(compressed)
+        encodings[encoding] = {"path": path + suffix, "bytes": len(compressed)}
+
+    return {
+        "path": path,
+        "bytes": len(data),
+        "sha256": hashlib.sha256(data).hexdigest(),
+        "encodings": encodings,
+    }
+
+
+def export_case(session, out_dir, title=None, description=None, impression=None):
+    """Write `session` to `out_dir` as chunks + manifest; return the manifest."""
+    os.makedirs(out_dir, exist_ok=True)
+
+    key_findings = session.get("key_findings")
+    if key_findings is None or impression is not None:
+        key_findings = derive_key_findings(session, impression or "")
+
+    chunks = {"chart": _write_chunk(out_dir, "chart", {
+        "chart": session["chart"],
+        "chart_text": session["chart_text"],
+    })}
+    for stage in STAGES:
+        chunks[stage] = _write_chunk(out_dir, stage, {"text": session["stages"][stage]})
+
+    manifest = {
+        "version": MANIFEST_VERSION,
+        "title": title or session.get("title", ""),
+        "description": description or session.get("description", ""),
+        "consult_message": session["consult_message"],
+        "resident_input": session["resident_input"],
+        "key_findings": key_findings,
+        "stages": STAGES,
+        "chunks": chunks,
+    }
+    with open(os.path.join(out_dir, "manifest.json"), "w", encoding="utf-8") as f:
+        json.dump(manifest, f, indent=2, ensure_ascii=False)
+        f.write("\n")
+    return manifest
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("session", help="session JSON saved by run_consult")
+    parser.add_argument("out_dir", help="output directory, e.g. web/cases/case3")
+    parser.add_argument("--title")
+    parser.add_argument("--description")
+    parser.add_argument("--impression", help="one-line impression for the key-findings banner")
+    args = parser.parse_args()
+
+    with open(args.session, encoding="utf-8") as f:
+        session = json.load(f)
+    manifest = export_case(session, args.out_dir, args.title, args.description, args.impression)
+
+    for name, chunk in manifest["chunks"].items():
+        sizes = ", ".join(f"{enc} {v['bytes']:,}" for enc, v in chunk["encodings"].items())
+        print(f"  {chunk['path']:<14} {chunk['bytes']:>7,} bytes  ({sizes})")
+    if brotli is None:
+        print("  (brotli not installed — skipped .br variants)")
+    print(f"Wrote {args.out_dir}/manifest.json")
+
+
+if __name__ == "__main__":
+    main()
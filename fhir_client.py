@@ -2,7 +2,6 @@
 
 import json
 import base64
-import requests
 
 FHIR_BASE = "https://hapi.fhir.org/baseR4"
 HEADERS = {"Accept": "application/fhir+json"}
@@ -10,6 +9,7 @@ HEADERS = {"Accept": "application/fhir+json"}
 
 def _get_bundle(resource_type, params):
     """Fetch a FHIR bundle and return the list of resources."""
+    import requests  # deferred — keeps `import fhir_client` cheap at startup
     resp = requests.get(f"{FHIR_BASE}/{resource_type}", params=params, headers=HEADERS)
     resp.raise_for_status()
     bundle = resp.json()
@@ -18,6 +18,7 @@ def _get_bundle(resource_type, params):
 
 def get_patient(patient_id):
     """Fetch patient demographics."""
+    import requests
     resp = requests.get(f"{FHIR_BASE}/Patient/{patient_id}", headers=HEADERS)
     resp.raise_for_status()
     p = resp.json()
@@ -52,17 +53,54 @@ def get_encounter(patient_id):
     return {"location": location, "reason": reason, "encounter_id": enc["id"]}
 
 
+def format_condition(r):
+    """Format a Condition resource as "Text (code)", or "" if it has no text."""
+    text = r.get("code", {}).get("text", "")
+    codings = r.get("code", {}).get("coding", [])
+    code = codings[0].get("code", "") if codings else ""
+    if not text:
+        return ""
+    return f"{text} ({code})" if code else text
+
+
+def format_observation(r):
+    """Format a vital-sign or lab Observation as a "Name: value unit" line."""
+    name = r.get("code", {}).get("text", "")
+    # Handle compound observations (blood pressure)
+    if r.get("component"):
+        parts = []
+        for comp in r["component"]:
+            comp_name = comp.get("code", {}).get("coding", [{}])[0].get("display", "")
+            val = comp.get("valueQuantity", {})
+            parts.append(f"{comp_name}: {val.get('value', '')} {val.get('unit', '')}")
+        return f"{name}: {' / '.join(parts)}"
+    val = r.get("valueQuantity", {})
+    return f"{name}: {val.get('value', '')} {val.get('unit', '')}"
+
+
+def medication_entry(r):
+    """Return (medication text, category code) for a MedicationRequest."""
+    med_text = r.get("medicationCodeableConcept", {}).get("text", "Unknown medication")
+    category = ""
+    for cat in r.get("category", []):
+        for coding in cat.get("coding", []):
+            category = coding.get("code", "")
+    return med_text, category
+
+
+def format_imaging(r):
+    """Format a DiagnosticReport as a {"study", "status", "findings"} dict."""
+    return {
+        "study": r.get("code", {}).get("text", ""),
+        "status": r.get("status", ""),
+        "findings": r.get("conclusion", "No conclusion provided"),
+    }
+
+
 def get_conditions(patient_id):
     """Fetch active conditions / problem list."""
     resources = _get_bundle("Condition", {"patient": patient_id, "clinical-status": "active"})
-    conditions = []
-    for r in resources:
-        text = r.get("code", {}).get("text", "")
-        codings = r.get("code", {}).get("coding", [])
-        code = codings[0].get("code", "") if codings else ""
-        if text:
-            conditions.append(f"{text} ({code})" if code else text)
-    return conditions
+    return [text for text in map(format_condition, resources) if text]
 
 
 def get_allergies(patient_id):
@@ -86,21 +124,7 @@ def get_vitals(patient_id):
         "_sort": "-date",
         "_count": "20",
     })
-    vitals = []
-    for r in resources:
-        name = r.get("code", {}).get("text", "")
-        # Handle compound observations (blood pressure)
-        if r.get("component"):
-            parts = []
-            for comp in r["component"]:
-                comp_name = comp.get("code", {}).get("coding", [{}])[0].get("display", "")
-                val = comp.get("valueQuantity", {})
-                parts.append(f"{comp_name}: {val.get('value', '')} {val.get('unit', '')}")
-            vitals.append(f"{name}: {' / '.join(parts)}")
-        else:
-            val = r.get("valueQuantity", {})
-            vitals.append(f"{name}: {val.get('value', '')} {val.get('unit', '')}")
-    return vitals
+    return [format_observation(r) for r in resources]
 
 
 def get_labs(patient_id):
@@ -111,25 +135,14 @@ def get_labs(patient_id):
         "_sort": "-date",
         "_count": "50",
     })
-    labs = []
-    for r in resources:
-        name = r.get("code", {}).get("text", "")
-        val = r.get("valueQuantity", {})
-        labs.append(f"{name}: {val.get('value', '')} {val.get('unit', '')}")
-    return labs
+    return [format_observation(r) for r in resources]
 
 
-def get_medications(patient_id):
-    """Fetch active medications, separated into home and inpatient."""
-    resources = _get_bundle("MedicationRequest", {"patient": patient_id, "status": "active"})
+def split_medications(entries):
+    """Split (text, category) pairs into {"home": [...], "inpatient": [...]}."""
     home_meds = []
     inpatient_meds = []
-    for r in resources:
-        med_text = r.get("medicationCodeableConcept", {}).get("text", "Unknown medication")
-        category = ""
-        for cat in r.get("category", []):
-            for coding in cat.get("coding", []):
-                category = coding.get("code", "")
+    for med_text, category in entries:
         if category == "community":
             home_meds.append(med_text)
         else:
@@ -137,16 +150,16 @@ def get_medications(patient_id):
     return {"home": home_meds, "inpatient": inpatient_meds}
 
 
+def get_medications(patient_id):
+    """Fetch active medications, separated into home and inpatient."""
+    resources = _get_bundle("MedicationRequest", {"patient": patient_id, "status": "active"})
+    return split_medications(medication_entry(r) for r in resources)
+
+
 def get_imaging(patient_id):
     """Fetch diagnostic/imaging reports."""
     resources = _get_bundle("DiagnosticReport", {"patient": patient_id, "_sort": "-date", "_count": "5"})
-    reports = []
-    for r in resources:
-        name = r.get("code", {}).get("text", "")
-        conclusion = r.get("conclusion", "No conclusion provided")
-        status = r.get("status", "")
-        reports.append({"study": name, "status": status, "findings": conclusion})
-    return reports
+    return [format_imaging(r) for r in resources]
 
 
 def get_notes(patient_id):
@@ -165,15 +178,26 @@ def get_notes(patient_id):
     return notes
 
 
-def pull_full_chart(patient_id):
-    """Pull all available data for a patient and return as structured dict."""
+def pull_full_chart(patient_id, store=None):
+    """Pull all available data for a patient and return as structured dict.
+
+    If `store` (a bulk_store.ChartStore) is given and holds this patient,
+    conditions, vitals, labs and medications are read from it instead of the
+    FHIR server.
+    """
     patient = get_patient(patient_id)
     encounter = get_encounter(patient_id)
-    conditions = get_conditions(patient_id)
     allergies = get_allergies(patient_id)
-    vitals = get_vitals(patient_id)
-    labs = get_labs(patient_id)
-    meds = get_medications(patient_id)
+    if store is not None and store.has_patient(patient_id):
+        conditions = store.get_conditions(patient_id)
+        vitals = store.get_vitals(patient_id)
+        labs = store.get_labs(patient_id)
+        meds = store.get_medications(patient_id)
+    else:
+        conditions = get_conditions(patient_id)
+        vitals = get_vitals(patient_id)
+        labs = get_labs(patient_id)
+        meds = get_medications(patient_id)
     imaging = get_imaging(patient_id)
     notes = get_notes(patient_id)
 
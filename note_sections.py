@@ -0,0 +1,117 @@
+"""Split a generated NOTE into sections so corrections can regenerate parts of it.
+
+NOTE_PROMPT output has three `## ` blocks (SURGICAL CONSULT NOTE, STAFFING
+SUMMARY, FOLLOW-UP TASKS). The consult note block is further split on its
+`**FIELD:**` lines (HPI, LABS, ASSESSMENT & PLAN, ...). Each section keeps its
+raw text, heading line included, so joining them reproduces the note exactly.
+"""
+
+import json
+import re
+
+_H2 = re.compile(r"^##\s+(.+?)\s*$")
+_FIELD = re.compile(r"^\*\*([A-Z][A-Z0-9 &/()\-]*?):?\*\*:?")
+_TRAILER = re.compile(r"(?:\s*\n---)?\s*\Z")
+
+CONSULT_NOTE = "SURGICAL CONSULT NOTE"
+
+
+def parse_note(note_text):
+    """Parse a NOTE output into an ordered list of {"key", "text"} sections.
+
+    Keys are the upper-cased headings ("HPI", "LABS", "STAFFING SUMMARY") and
+    are unique: a field heading that repeats (e.g. a second `**PLAN:**` inside
+    A&P) stays part of the current section rather than starting a new one.
+    Field sections also carry the "parent" `## ` heading they sit under.
+    Text before the first heading is kept under the key "".
+    """
+    sections = [{"key": "", "text": ""}]
+    current_h2 = ""
+    for line in note_text.splitlines(keepends=True):
+        h2 = _H2.match(line)
+        field = _FIELD.match(line) if current_h2 == CONSULT_NOTE else None
+        if field and any(s["key"] == field.group(1).strip() for s in sections):
+            field = None
+        if h2:
+            current_h2 = h2.group(1).strip().upper()
+            sections.append({"key": current_h2, "text": line})
+        elif field:
+            sections.append({"key": field.group(1).strip(), "text": line, "parent": current_h2})
+        else:
+            sections[-1]["text"] += line
+    if not sections[0]["text"]:
+        sections.pop(0)
+    return sections
+
+
+def assemble_note(sections):
+    """Join parsed sections back into the full note text."""
+    return "".join(s["text"] for s in sections)
+
+
+def section_keys(sections):
+    """Keys of the routable sections, in note order.
+
+    A `## ` heading that contains field sections (SURGICAL CONSULT NOTE) is a
+    container, not a section that can be rewritten on its own, so it's left out.
+    """
+    containers = {s["parent"] for s in sections if "parent" in s}
+    return [s["key"] for s in sections if s["key"] and s["key"] not in containers]
+
+
+def parse_section_list(router_text, sections):
+    """Parse the router's JSON list of affected section keys.
+
+    Duplicates are dropped, keeping the router's order. Returns [] if the
+    router says nothing needs to change. Returns None if
+    the reply can't be parsed, or names only unknown sections, so the caller
+    can fall back to a full regeneration.
+    """
+    match = re.search(r"\[.*?\]", router_text, re.DOTALL)
+    if not match:
+        return None
+    try:
+        requested = json.loads(match.group())
+    except ValueError:
+        return None
+    if not requested:
+        return []
+    known = set(section_keys(sections))
+    affected = []
+    for k in requested:
+        key = k.strip().upper() if isinstance(k, str) else None
+        if key in known and key not in affected:
+            affected.append(key)
+    return affected or None
+
+
+def _heading_key(line):
+    """Key named by a heading line, or None if the line isn't a heading."""
+    h2 = _H2.match(line)
+    if h2:
+        return h2.group(1).strip().upper()
+    field = _FIELD.match(line)
+    return field.group(1).strip() if field else None
+
+
+def replace_section(sections, key, new_text):
+    """Return a copy of `sections` with `key`'s text replaced.
+
+    The heading is restored if the model dropped it, and the original trailing
+    whitespace and `---` rule are kept so the note's layout is unchanged.
+    """
+    updated = []
+    for s in sections:
+        if s["key"] != key:
+            updated.append(s)
+            continue
+        old = s["text"]
+        body = _TRAILER.sub("", new_text.strip())
+        if _heading_key(body.splitlines()[0] if body else "") != key:
+            if _H2.match(old.splitlines()[0]):
+                body = old.splitlines()[0] + "\n\n" + body
+            else:
+                body = f"**{key}:** " + body
+        trailing = _TRAILER.search(old).group()
+        updated.append({"key": key, "text": body + trailing})
+    return updated
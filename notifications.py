@@ -0,0 +1,291 @@
+"""Push-based chart updates via FHIR Subscriptions (rest-hook).
+
+Instead of re-running pull_full_chart to catch a new lactate or a final CT
+read, the agent registers rest-hook Subscriptions for Observation and
+DiagnosticReport on each patient with an open consult. The EHR (or a local
+stand-in) PUTs changed resources to `[endpoint]/[type]/[id]` on a small HTTP
+receiver. The receiver updates the in-memory chart and flags critical values
+with the same criteria as triage_rules. Notifications without a payload are
+treated as pings and trigger a refetch.
+"""
+
+import json
+import threading
+
+from fhir_client import (
+    FHIR_BASE,
+    HEADERS,
+    format_observation,
+    format_imaging,
+    get_vitals,
+    get_labs,
+    get_imaging,
+)
+from triage_rules import parse_measurement, check_value, check_imaging
+
+NOTIFY_PATH = "/fhir-notify"
+WATCHED_TYPES = ["Observation", "DiagnosticReport"]
+
+
+def build_subscription(patient_id, resource_type, endpoint):
+    """Build an R4 rest-hook Subscription for one resource type on one patient."""
+    return {
+        "resourceType": "Subscription",
+        "status": "requested",
+        "reason": "Surgical consult — critical result notifications",
+        "criteria": f"{resource_type}?patient={patient_id}",
+        "channel": {
+            "type": "rest-hook",
+            "endpoint": endpoint,
+            "payload": "application/fhir+json",
+        },
+    }
+
+
+def subscribe(patient_id, endpoint, fhir_base=FHIR_BASE):
+    """Register Subscriptions for WATCHED_TYPES; return the created Subscription ids."""
+    import requests
+
+    ids = []
+    for resource_type in WATCHED_TYPES:
+        resp = requests.post(
+            f"{fhir_base}/Subscription",
+            json=build_subscription(patient_id, resource_type, endpoint),
+            headers={**HEADERS, "Content-Type": "application/fhir+json"},
+        )
+        resp.raise_for_status()
+        ids.append(resp.json()["id"])
+    return ids
+
+
+def unsubscribe(subscription_ids, fhir_base=FHIR_BASE):
+    """Delete Subscriptions created by subscribe()."""
+    import requests
+
+    for sub_id in subscription_ids:
+        resp = requests.delete(f"{fhir_base}/Subscription/{sub_id}", headers=HEADERS)
+        resp.raise_for_status()
+
+
+def fetch_resource(resource_type, resource_id, fhir_base=FHIR_BASE):
+    """Read one resource from the FHIR server."""
+    import requests
+
+    resp = requests.get(f"{fhir_base}/{resource_type}/{resource_id}", headers=HEADERS)
+    resp.raise_for_status()
+    return resp.json()
+
+
+def _resources_in(payload):
+    """Yield resources from a notification body (a single resource or a Bundle)."""
+    if not isinstance(payload, dict):
+        return
+    if payload.get("resourceType") == "Bundle":
+        for entry in payload.get("entry") or []:
+            if isinstance(entry, dict) and "resource" in entry:
+                yield from _resources_in(entry["resource"])
+    elif payload.get("resourceType") in WATCHED_TYPES:
+        yield payload
+
+
+def _category(r):
+    for cat in r.get("category", []):
+        for coding in cat.get("coding", []):
+            return coding.get("code", "")
+    return ""
+
+
+class ConsultSessions:
+    """Charts for patients with open consults, updated from notifications.
+
+    `on_alert` is called with each critical alert dict:
+    {"patient_id", "resource", "display", "flags"}.
+    """
+
+    def __init__(self, on_alert=None):
+        self.on_alert = on_alert or print_alert
+        self.lock = threading.Lock()
+        self.charts = {}
+        # patient_id → {resource id: chart entry} so updates replace in place
+        self.seen = {}
+
+    def open(self, patient_id, chart_data):
+        with self.lock:
+            self.charts[patient_id] = chart_data
+            self.seen[patient_id] = {}
+
+    def close(self, patient_id):
+        with self.lock:
+            self.charts.pop(patient_id, None)
+            self.seen.pop(patient_id, None)
+
+    def snapshot(self, patient_id):
+        """Copy of the current chart, safe to format while updates arrive."""
+        with self.lock:
+            return json.loads(json.dumps(self.charts[patient_id]))
+
+    def apply(self, resource):
+        """Apply one changed resource; return the alert dict or None."""
+        ref = resource.get("subject", {}).get("reference", "")
+        patient_id = ref.rsplit("/", 1)[-1]
+        with self.lock:
+            chart = self.charts.get(patient_id)
+            if chart is None:
+                return None
+            if resource["resourceType"] == "Observation":
+                alert = self._apply_observation(patient_id, chart, resource)
+            else:
+                alert = self._apply_report(patient_id, chart, resource)
+        if alert:
+            self.on_alert(alert)
+        return alert
+
+    def refetch(self, resource_type, resource_id):
+        """Handle a no-payload ping for one resource by reading it from the server."""
+        return self.apply(fetch_resource(resource_type, resource_id))
+
+    def refresh(self):
+        """Handle a bare ping: re-pull vitals, labs and imaging for every open chart.
+
+        Alerts on readings that weren't in the chart before.
+        """
+        with self.lock:
+            patient_ids = list(self.charts)
+        for patient_id in patient_ids:
+            fresh = {"vitals": get_vitals(patient_id), "labs": get_labs(patient_id),
+                     "imaging": get_imaging(patient_id)}
+            alerts = []
+            with self.lock:
+                chart = self.charts.get(patient_id)
+                if chart is None:
+                    continue
+                for line in fresh["vitals"] + fresh["labs"]:
+                    if line not in chart["vitals"] and line not in chart["labs"]:
+                        flags = [label for measure, value in parse_measurement(line)
+                                 for label, _ in check_value(measure, value)]
+                        if flags:
+                            alerts.append({"patient_id": patient_id, "resource": "Observation",
+                                           "display": line, "flags": flags})
+                for report in fresh["imaging"]:
+                    if report["status"] == "final" and report not in chart["imaging"]:
+                        alerts.append({"patient_id": patient_id, "resource": "DiagnosticReport",
+                                       "display": f"[FINAL] {report['study']}: {report['findings']}",
+                                       "flags": check_imaging(report["findings"])})
+                chart.update(fresh)
+                self.seen[patient_id] = {}
+            for alert in alerts:
+                self.on_alert(alert)
+
+    def _replace(self, patient_id, items, resource_id, new_item):
+        """Insert `new_item` newest-first, replacing the prior version of this resource."""
+        seen = self.seen[patient_id]
+        old_item = seen.get(resource_id)
+        if old_item is not None and old_item in items:
+            items.remove(old_item)
+        items.insert(0, new_item)
+        seen[resource_id] = new_item
+
+    def _apply_observation(self, patient_id, chart, r):
+        category = _category(r)
+        if category not in ("vital-signs", "laboratory"):
+            return None
+        display = format_observation(r)
+        key = "vitals" if category == "vital-signs" else "labs"
+        self._replace(patient_id, chart[key], r.get("id"), display)
+
+        flags = []
+        for measure, value in parse_measurement(display):
+            flags.extend(label for label, _ in check_value(measure, value))
+        if not flags:
+            return None
+        return {"patient_id": patient_id, "resource": "Observation",
+                "display": display, "flags": flags}
+
+    def _apply_report(self, patient_id, chart, r):
+        report = format_imaging(r)
+        if r.get("id") not in self.seen[patient_id]:
+            # A final read supersedes the preliminary one pulled with the chart.
+            chart["imaging"][:] = [img for img in chart["imaging"]
+                                   if img["study"] != report["study"]]
+        self._replace(patient_id, chart["imaging"], r.get("id"), report)
+        if report["status"] != "final":
+            return None
+        return {"patient_id": patient_id, "resource": "DiagnosticReport",
+                "display": f"[FINAL] {report['study']}: {report['findings']}",
+                "flags": check_imaging(report["findings"])}
+
+
+def print_alert(alert):
+    flags = ", ".join(alert["flags"]) or "new final read"
+    print(f"\n🔔 NEW RESULT ({flags}): {alert['display']}\n", flush=True)
+
+
+def _notification_target(path):
+    """Parse a notification path into (resource_type, id).
+
+    Accepts NOTIFY_PATH itself → (None, None) and NOTIFY_PATH/<Type>/<id>, as
+    sent by R4 rest-hook servers. Returns None for any other path.
+    """
+    path = path.split("?")[0].rstrip("/")
+    if path == NOTIFY_PATH:
+        return None, None
+    if not path.startswith(NOTIFY_PATH + "/"):
+        return None
+    parts = path[len(NOTIFY_PATH) + 1:].split("/")
+    if len(parts) != 2 or not all(parts):
+        return None
+    return parts[0], parts[1]
+
+
+def _make_handler(sessions):
+    from http.server import BaseHTTPRequestHandler
+
+    class NotificationHandler(BaseHTTPRequestHandler):
+        def do_PUT(self):
+            target = _notification_target(self.path)
+            if target is None:
+                self.send_error(404)
+                return
+            length = int(self.headers.get("Content-Length", 0))
+            body = self.rfile.read(length).strip() if length else b""
+            try:
+                payload = json.loads(body) if body else {}
+            except ValueError:
+                self.send_error(400, "Invalid JSON")
+                return
+            if not isinstance(payload, dict):
+                self.send_error(400, "Expected a FHIR resource or Bundle")
+                return
+
+            # Apply before acknowledging, so a 200 means the chart is updated.
+            for resource in _resources_in(payload):
+                sessions.apply(resource)
+            self.send_response(200)
+            self.end_headers()
+            if payload:
+                return
+            # No payload: a ping. Refetch off the request thread so the EHR
+            # isn't kept waiting on our round-trip back to it.
+            resource_type, resource_id = target
+            if resource_type in WATCHED_TYPES:
+                work = lambda: sessions.refetch(resource_type, resource_id)
+            else:
+                work = sessions.refresh
+            threading.Thread(target=work, daemon=True).start()
+
+        # R4 rest-hook servers PUT to [endpoint]/[type]/[id]; stand-ins may POST
+        do_POST = do_PUT
+
+        def log_message(self, format, *args):
+            pass  # keep the CLI output clean
+
+    return NotificationHandler
+
+
+def start_receiver(sessions, host="127.0.0.1", port=8765):
+    """Start the rest-hook receiver on a daemon thread; return the server."""
+    from http.server import ThreadingHTTPServer
+
+    server = ThreadingHTTPServer((host, port), _make_handler(sessions))
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
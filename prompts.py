@@ -186,3 +186,46 @@ Ranked list of what needs to happen next, in order of urgency:
 - [ ] Short-term actions (e.g., repeat labs in 4h, reassess after fluids)
 - [ ] Documentation/logistics (e.g., complete H&P, update family)
 """
+
+NOTE_ROUTER_PROMPT = """\
+The resident has a correction to the consult note below.
+
+Correction:
+{correction}
+
+The note has these sections:
+{section_list}
+
+Current note:
+{note}
+
+Which sections must change to reflect the correction? Include any section \
+whose content depends on the corrected facts (e.g., a new exam finding may \
+change Physical Exam, Assessment & Plan, Staffing Summary and Follow-up Tasks).
+
+Reply with ONLY a JSON list of section names exactly as written above, \
+e.g. ["PHYSICAL EXAM", "STAFFING SUMMARY"].
+"""
+
+NOTE_SECTION_PROMPT = """\
+Consult: "{consult_message}"
+Chart data:
+{chart_data}
+Resident input / corrections:
+{resident_input}
+
+Current consult note (for context — do not rewrite it all):
+{note}
+
+Rewrite ONLY the "{section}" section so it reflects this correction:
+{correction}
+
+Current text of that section:
+{section_text}
+
+Keep the same heading and format as the current section, and keep it \
+consistent with the rest of the note. Apply the same rules as the full note: \
+every claim supported by chart data or the resident's input, anything \
+unavailable marked [PENDING — verify on exam/interview]. Output only the \
+rewritten section.
+"""
@@ -0,0 +1,28 @@
+"""ChartStore ordering across time zones."""
+
+import json
+
+from bulk_store import ChartStore
+
+
+def _lactate(obs_id, effective, value):
+    return json.dumps({
+        "resourceType": "Observation", "id": obs_id, "status": "final",
+        "subject": {"reference": "Patient/p1"},
+        "category": [{"coding": [{"code": "laboratory"}]}],
+        "code": {"text": "Lactate"},
+        "effectiveDateTime": effective,
+        "valueQuantity": {"value": value, "unit": "mmol/L"},
+    })
+
+
+def test_labs_sort_by_instant_across_utc_offsets():
+    store = ChartStore(":memory:")
+    store.ingest_lines([
+        _lactate("a", "2024-03-01T10:00:00-05:00", 1.0),   # 15:00Z
+        _lactate("b", "2024-03-01T14:30:00Z", 2.0),        # 14:30Z
+        _lactate("c", "2024-03-01T16:00:00.5+01:00", 3.0),  # 15:00:00.5Z
+    ])
+    labs = store.get_labs("p1")
+    store.close()
+    assert [line.split(":")[1].split()[0] for line in labs] == ["3.0", "1.0", "2.0"]
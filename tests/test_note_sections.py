@@ -0,0 +1,66 @@
+"""NOTE section parsing, using the web demo notes as fixtures."""
+
+import json
+import os
+
+import pytest
+
+from note_sections import assemble_note, parse_note, parse_section_list, replace_section, section_keys
+
+CASES = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "web", "cases")
+
+
+def _note(case):
+    with open(os.path.join(CASES, case, "note.json"), encoding="utf-8") as f:
+        return json.load(f)["text"]
+
+
+@pytest.mark.parametrize("case", ["case1", "case2"])
+def test_round_trip(case):
+    note = _note(case)
+    sections = parse_note(note)
+    assert assemble_note(sections) == note
+    keys = section_keys(sections)
+    assert len(keys) == len(set(keys))
+    assert {"HPI", "LABS", "ASSESSMENT & PLAN", "STAFFING SUMMARY", "FOLLOW-UP TASKS"} <= set(keys)
+    assert "SURGICAL CONSULT NOTE" not in keys
+
+
+@pytest.mark.parametrize("case", ["case1", "case2"])
+def test_replace_section_keeps_the_rest_verbatim(case):
+    note = _note(case)
+    sections = parse_note(note)
+    updated = replace_section(sections, "HPI", "Corrected history.")
+    updated = replace_section(updated, "STAFFING SUMMARY", "Hey Dr. X.\n\n---")
+
+    by_key = {s["key"]: s["text"] for s in updated}
+    assert by_key["HPI"].startswith("**HPI:** Corrected history.")
+    assert by_key["STAFFING SUMMARY"].startswith("## STAFFING SUMMARY\n\nHey Dr. X.")
+    # Original trailing spacing / rule is kept, and nothing else changed
+    original = {s["key"]: s["text"] for s in sections}
+    assert by_key["STAFFING SUMMARY"].endswith(original["STAFFING SUMMARY"][-7:])
+    for key in original:
+        if key not in ("HPI", "STAFFING SUMMARY"):
+            assert by_key[key] == original[key]
+
+
+def test_repeated_field_heading_stays_in_its_section():
+    note = ("## SURGICAL CONSULT NOTE\n\n**HPI:** pain.\n\n"
+            "**ASSESSMENT & PLAN:**\n**PLAN:** fluids\n**PLAN:** OR\n\n"
+            "## STAFFING SUMMARY\n\nHey.\n")
+    sections = parse_note(note)
+    assert assemble_note(sections) == note
+    keys = section_keys(sections)
+    assert keys.count("PLAN") == 1
+    plan = next(s for s in sections if s["key"] == "PLAN")
+    assert "**PLAN:** OR" in plan["text"]
+
+
+def test_parse_section_list():
+    sections = parse_note(_note("case1"))
+    assert parse_section_list('Sure: ["hpi", "Staffing Summary", "bogus"]', sections) == \
+        ["HPI", "STAFFING SUMMARY"]
+    assert parse_section_list('["LABS", "labs", "HPI", "LABS"]', sections) == ["LABS", "HPI"]
+    assert parse_section_list("[]", sections) == []
+    assert parse_section_list('["SURGICAL CONSULT NOTE"]', sections) is None
+    assert parse_section_list("no list here", sections) is None
@@ -0,0 +1,105 @@
+"""Rest-hook receiver checks against a local stand-in (no EHR needed)."""
+
+import json
+import time
+import urllib.request
+
+import pytest
+
+import notifications
+from notifications import NOTIFY_PATH, ConsultSessions, start_receiver
+
+LACTATE = {
+    "resourceType": "Observation",
+    "id": "o1",
+    "status": "final",
+    "category": [{"coding": [{"code": "laboratory"}]}],
+    "code": {"text": "Lactate"},
+    "subject": {"reference": "Patient/p1"},
+    "valueQuantity": {"value": 5.2, "unit": "mmol/L"},
+}
+
+
+def _chart():
+    return {"vitals": [], "labs": ["Lactate: 1.1 mmol/L"], "imaging": []}
+
+
+@pytest.fixture
+def receiver():
+    alerts = []
+    sessions = ConsultSessions(on_alert=alerts.append)
+    sessions.open("p1", _chart())
+    server = start_receiver(sessions, port=0)
+    base = f"http://127.0.0.1:{server.server_address[1]}"
+    yield sessions, alerts, base
+    server.shutdown()
+
+
+def _send(method, url, body=None):
+    data = json.dumps(body).encode() if body is not None else b""
+    req = urllib.request.Request(url, data=data, method=method,
+                                 headers={"Content-Type": "application/fhir+json"})
+    with urllib.request.urlopen(req) as resp:
+        return resp.status
+
+
+def _wait_for(condition, timeout=2.0):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if condition():
+            return True
+        time.sleep(0.01)
+    return False
+
+
+def test_put_to_type_id_suffix_updates_chart(receiver):
+    sessions, alerts, base = receiver
+    assert _send("PUT", f"{base}{NOTIFY_PATH}/Observation/o1", LACTATE) == 200
+
+    assert sessions.snapshot("p1")["labs"][0] == "Lactate: 5.2 mmol/L"
+    assert alerts[0]["flags"] == ["Lactate > 4", "Lactate > 2"]
+
+
+def test_empty_ping_refetches_resource(receiver, monkeypatch):
+    sessions, alerts, base = receiver
+    fetched = []
+
+    def fake_fetch(resource_type, resource_id, fhir_base=None):
+        fetched.append((resource_type, resource_id))
+        return LACTATE
+
+    monkeypatch.setattr(notifications, "fetch_resource", fake_fetch)
+    assert _send("PUT", f"{base}{NOTIFY_PATH}/Observation/o1") == 200
+
+    assert _wait_for(lambda: alerts)
+    assert fetched == [("Observation", "o1")]
+    assert sessions.snapshot("p1")["labs"][0] == "Lactate: 5.2 mmol/L"
+
+
+def test_unknown_path_is_rejected(receiver):
+    _, _, base = receiver
+    with pytest.raises(urllib.error.HTTPError) as err:
+        _send("PUT", f"{base}/elsewhere/Observation/o1", LACTATE)
+    assert err.value.code == 404
+
+
+@pytest.mark.parametrize("body", [[LACTATE], "Observation", 5])
+def test_non_object_body_is_rejected(receiver, body):
+    sessions, alerts, base = receiver
+    with pytest.raises(urllib.error.HTTPError) as err:
+        _send("PUT", f"{base}{NOTIFY_PATH}/Observation/o1", body)
+    assert err.value.code == 400
+    assert sessions.snapshot("p1") == _chart()
+    assert alerts == []
+
+
+def test_bare_ping_refreshes_open_charts(receiver, monkeypatch):
+    sessions, alerts, base = receiver
+    monkeypatch.setattr(notifications, "get_vitals", lambda pid: ["Heart rate: 128 bpm"])
+    monkeypatch.setattr(notifications, "get_labs", lambda pid: ["Lactate: 1.1 mmol/L"])
+    monkeypatch.setattr(notifications, "get_imaging", lambda pid: [])
+    assert _send("POST", f"{base}{NOTIFY_PATH}") == 200
+
+    assert _wait_for(lambda: alerts)
+    assert sessions.snapshot("p1")["vitals"] == ["Heart rate: 128 bpm"]
+    assert [a["display"] for a in alerts] == ["Heart rate: 128 bpm"]
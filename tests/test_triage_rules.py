@@ -0,0 +1,102 @@
+"""Deterministic triage checks, using the web demo charts as fixtures."""
+
+import json
+import os
+
+import pytest
+
+from triage_rules import (
+    acuity_disagrees,
+    expected_acuity,
+    find_red_flags,
+    parse_acuity,
+    parse_measurement,
+)
+
+CASES = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "web", "cases")
+
+
+def _load(case, chunk):
+    with open(os.path.join(CASES, case, f"{chunk}.json"), encoding="utf-8") as f:
+        return json.load(f)
+
+
+@pytest.mark.parametrize("text, expected", [
+    ("- **Overall acuity**: 🔴 **URGENT**", "URGENT"),
+    ("Overall acuity: 🟡 SEMI-URGENT", "SEMI-URGENT"),
+    ("Overall acuity: 🟢 routine", "ROUTINE"),
+    # Call on the line after the heading
+    ("**Overall acuity:**\n🔴 URGENT", "URGENT"),
+    ("**Overall acuity:**\n\nSEMI-URGENT", "SEMI-URGENT"),
+    # Negated levels don't count
+    ("Overall acuity: URGENT — not semi-urgent", "URGENT"),
+    ("Acuity\nNot urgent at this time; routine", "ROUTINE"),
+    ("Overall acuity: non-urgent, routine", "ROUTINE"),
+    # Template echo or several levels → ambiguous
+    ("Overall acuity: 🔴 URGENT / 🟡 SEMI-URGENT / 🟢 ROUTINE", None),
+    ("Overall acuity: urgent or semi-urgent", None),
+    ("No call made", None),
+    ("Overall acuity: pending\nfoo", None),
+])
+def test_parse_acuity(text, expected):
+    assert parse_acuity(text) == expected
+
+
+@pytest.mark.parametrize("case", ["case1", "case2"])
+def test_demo_triage_outputs_parse_urgent(case):
+    assert parse_acuity(_load(case, "triage")["text"]) == "URGENT"
+
+
+@pytest.mark.parametrize("case", ["case1", "case2"])
+def test_demo_charts_are_urgent_and_agree_with_triage(case):
+    chart = _load(case, "chart")["chart"]
+    flags = find_red_flags(chart)
+    labels = {f["label"] for f in flags}
+
+    assert {"Lactate > 4", "HR > 90", "WBC > 12"} <= labels
+    assert expected_acuity(flags) == "URGENT"
+    assert not acuity_disagrees(_load(case, "triage")["text"], flags)
+
+
+def test_hypotension_flag_uses_worst_reading():
+    chart = _load("case2", "chart")["chart"]
+    flags = {f["label"]: f for f in find_red_flags(chart)}
+    assert flags["Hypotension (SBP < 90)"]["value"] == 88
+
+
+def test_under_called_acuity_disagrees():
+    flags = find_red_flags(_load("case1", "chart")["chart"])
+    assert acuity_disagrees("Overall acuity: 🟡 SEMI-URGENT", flags)
+    assert acuity_disagrees("no acuity stated", flags)
+
+
+@pytest.mark.parametrize("flags, expected", [
+    ([], "ROUTINE"),
+    ([{"label": "HR > 90", "severity": "sirs", "value": 95}], "SEMI-URGENT"),
+    ([{"label": "HR > 90", "severity": "sirs", "value": 95},
+      {"label": "Temp > 38", "severity": "sirs", "value": 38.5},
+      {"label": "Creatinine > 1.5", "severity": "end-organ", "value": 2}], "URGENT"),
+    ([{"label": "Lactate > 4", "severity": "urgent", "value": 5}], "URGENT"),
+])
+def test_expected_acuity(flags, expected):
+    assert expected_acuity(flags) == expected
+
+
+@pytest.mark.parametrize("line, expected", [
+    ("Body temperature: 38.3 °C", [("temp", 38.3)]),
+    ("Body temperature: 38.3 Cel", [("temp", 38.3)]),
+    ("Body temperature: 97 degF", [("temp", pytest.approx(36.11, abs=0.01))]),
+    ("Lactate: 4.8 mmol/L", [("lactate", 4.8)]),
+    ("Lactate: 18 mg/dL", [("lactate", pytest.approx(2.0, abs=0.01))]),
+    ("Blood pressure: Systolic: 94 mmHg / Diastolic: 58 mmHg", [("sbp", 94)]),
+    # Unknown or missing units are skipped, not compared blindly
+    ("Lactate: 4.8 ", []),
+    ("Body temperature: 310 K", []),
+])
+def test_parse_measurement_units(line, expected):
+    assert parse_measurement(line) == expected
+
+
+def test_fahrenheit_and_mg_dl_do_not_trip_thresholds():
+    chart = {"vitals": ["Body temperature: 97 degF"], "labs": ["Lactate: 18 mg/dL"]}
+    assert find_red_flags(chart) == []
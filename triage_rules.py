@@ -0,0 +1,199 @@
+"""Deterministic red-flag checks on pulled chart data.
+
+Mirrors the criteria TRIAGE_PROMPT asks the model to apply (hemodynamics,
+SIRS, end-organ dysfunction) so the agent can sanity-check the model's
+acuity call against the raw vitals and labs.
+"""
+
+import re
+
+ACUITY_LEVELS = ["ROUTINE", "SEMI-URGENT", "URGENT"]
+
+# (key, label, comparison, threshold, severity)
+# severity "urgent" alone drives URGENT acuity; "sirs" and "end-organ" combine.
+CRITERIA = [
+    ("sbp", "Hypotension (SBP < 90)", "<", 90, "urgent"),
+    ("lactate", "Lactate > 4", ">", 4, "urgent"),
+    ("lactate", "Lactate > 2", ">", 2, "end-organ"),
+    ("creatinine", "Creatinine > 1.5", ">", 1.5, "end-organ"),
+    ("temp", "Temp > 38", ">", 38, "sirs"),
+    ("temp", "Temp < 36", "<", 36, "sirs"),
+    ("hr", "HR > 90", ">", 90, "sirs"),
+    ("rr", "RR > 20", ">", 20, "sirs"),
+    ("wbc", "WBC > 12", ">", 12, "sirs"),
+    ("wbc", "WBC < 4", "<", 4, "sirs"),
+]
+
+# Imaging findings TRIAGE_PROMPT calls out as "likely needs OR"
+IMAGING_RED_FLAGS = ["free air", "pneumoperitoneum"]
+
+# Chart display names (as produced by fhir_client) → criterion key
+_NAME_KEYS = {
+    "body temperature": "temp",
+    "temperature": "temp",
+    "heart rate": "hr",
+    "respiratory rate": "rr",
+    "wbc": "wbc",
+    "white blood cell count": "wbc",
+    "lactate": "lactate",
+    "creatinine": "creatinine",
+}
+
+# Units each criterion key is accepted in → conversion to the CRITERIA unit.
+# Readings in any other (or no) unit are skipped rather than compared blindly.
+_UNITS = {
+    "temp": {
+        "°c": lambda v: v, "cel": lambda v: v, "degc": lambda v: v, "c": lambda v: v,
+        "°f": lambda v: (v - 32) * 5 / 9, "degf": lambda v: (v - 32) * 5 / 9,
+        "f": lambda v: (v - 32) * 5 / 9,
+    },
+    "hr": {"bpm": lambda v: v, "/min": lambda v: v, "beats/min": lambda v: v},
+    "rr": {"/min": lambda v: v, "breaths/min": lambda v: v},
+    "sbp": {"mmhg": lambda v: v, "mm hg": lambda v: v},
+    "wbc": {"10*3/ul": lambda v: v, "10^3/ul": lambda v: v, "k/ul": lambda v: v,
+            "10*9/l": lambda v: v, "10^9/l": lambda v: v},
+    "lactate": {"mmol/l": lambda v: v, "mg/dl": lambda v: v / 9.008},
+    "creatinine": {"mg/dl": lambda v: v, "umol/l": lambda v: v / 88.4,
+                   "µmol/l": lambda v: v / 88.4},
+}
+
+_NUMBER = re.compile(r"-?\d+(?:\.\d+)?")
+
+
+def _value_in_unit(key, text):
+    """Parse "<number> <unit>" and convert to the CRITERIA unit, or None.
+
+    Returns None if there's no number or the unit isn't one _UNITS accepts.
+    """
+    match = _NUMBER.search(text)
+    if not match:
+        return None
+    unit = text[match.end():].strip().lower().replace("[", "").replace("]", "")
+    convert = _UNITS[key].get(unit)
+    return convert(float(match.group())) if convert else None
+
+
+def measurement_key(name):
+    """Map a chart display name (e.g. "Heart rate") to a criterion key, or None."""
+    return _NAME_KEYS.get(name.strip().lower())
+
+
+def parse_measurement(line):
+    """Parse one chart vitals/labs line into a list of (key, value) pairs.
+
+    Handles plain lines ("Lactate: 4.8 mmol/L") and the compound blood
+    pressure line ("Blood pressure: Systolic: 94 mmHg / Diastolic: 58 mmHg").
+    Values are converted to the CRITERIA units (°C, mmol/L, ...); readings in
+    an unrecognised unit are skipped.
+    """
+    name, _, rest = line.partition(":")
+    if name.strip().lower() == "blood pressure":
+        for part in rest.split(" / "):
+            if "systolic" in part.lower():
+                value = _value_in_unit("sbp", part.partition(":")[2])
+                return [("sbp", value)] if value is not None else []
+        return []
+    key = measurement_key(name)
+    if key is None:
+        return []
+    value = _value_in_unit(key, rest)
+    return [(key, value)] if value is not None else []
+
+
+def check_value(key, value):
+    """Return the criteria (label, severity) tripped by a single measurement."""
+    tripped = []
+    for crit_key, label, op, threshold, severity in CRITERIA:
+        if crit_key != key:
+            continue
+        if (op == "<" and value < threshold) or (op == ">" and value > threshold):
+            tripped.append((label, severity))
+    return tripped
+
+
+def check_imaging(findings):
+    """Return the IMAGING_RED_FLAGS mentioned in a radiology read."""
+    text = findings.lower()
+    return [term for term in IMAGING_RED_FLAGS
+            if term in text and f"no {term}" not in text]
+
+
+def find_red_flags(chart_data):
+    """Check every vitals/labs reading in the chart against CRITERIA.
+
+    Returns a list of dicts with keys: label, severity, value. Each criterion
+    is reported once, with the worst reading seen.
+    """
+    flags = {}
+    for line in chart_data.get("vitals", []) + chart_data.get("labs", []):
+        for key, value in parse_measurement(line):
+            for label, severity in check_value(key, value):
+                prev = flags.get(label)
+                worse = prev is None or (
+                    value < prev["value"] if "<" in label else value > prev["value"]
+                )
+                if worse:
+                    flags[label] = {"label": label, "severity": severity, "value": value}
+    return list(flags.values())
+
+
+def expected_acuity(flags):
+    """Minimum acuity the red flags support: URGENT, SEMI-URGENT or ROUTINE."""
+    severities = [f["severity"] for f in flags]
+    sirs = len({f["label"].split()[0] for f in flags if f["severity"] == "sirs"})
+    if "urgent" in severities or (sirs >= 2 and "end-organ" in severities):
+        return "URGENT"
+    if flags:
+        return "SEMI-URGENT"
+    return "ROUTINE"
+
+
+_ACUITY_EMOJI = {"🔴": "URGENT", "🟡": "SEMI-URGENT", "🟢": "ROUTINE"}
+_ACUITY_TOKEN = re.compile(r"\b(SEMI[- ]URGENT|URGENT|ROUTINE)\b")
+_NEGATED = re.compile(r"\b(NOT|NON)[\s-]*$")
+
+
+def _acuity_levels(line):
+    """Set of acuity levels a line names, via emoji or level word.
+
+    Words preceded by "not"/"non" ("not semi-urgent", "non-urgent") don't count.
+    """
+    levels = {level for emoji, level in _ACUITY_EMOJI.items() if emoji in line}
+    upper = line.upper()
+    for match in _ACUITY_TOKEN.finditer(upper):
+        if _NEGATED.search(upper[:match.start()]):
+            continue
+        token = match.group(1)
+        levels.add("SEMI-URGENT" if token.startswith("SEMI") else token)
+    return levels
+
+
+def parse_acuity(triage_text):
+    """Pull the overall acuity call out of a TRIAGE output, or None if absent.
+
+    Looks at the line mentioning "acuity" and, if the call isn't on it, the
+    next non-blank line (e.g. "**Overall acuity:**" then "🔴 URGENT"). A line
+    naming more than one level (e.g. the prompt's own "🔴 URGENT / 🟡 SEMI-URGENT
+    / 🟢 ROUTINE" template) is ambiguous and returns None, which escalates.
+    """
+    lines = triage_text.splitlines()
+    for i, line in enumerate(lines):
+        if "acuity" not in line.lower():
+            continue
+        levels = _acuity_levels(line)
+        if not levels:
+            following = [l for l in lines[i + 1:] if l.strip()]
+            levels = _acuity_levels(following[0]) if following else set()
+        if len(levels) == 1:
+            return levels.pop()
+        if len(levels) > 1:
+            return None
+    return None
+
+
+def acuity_disagrees(triage_text, flags):
+    """True when the model's acuity is missing or below what the flags support."""
+    called = parse_acuity(triage_text)
+    if called is None:
+        return True
+    return ACUITY_LEVELS.index(called) < ACUITY_LEVELS.index(expected_acuity(flags))
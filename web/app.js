@@ -1,6 +1,8 @@
 // Surgical Consult Agent — Web Demo
 
 let currentCase = null;
+let currentCaseName = null;
+let stageRequests = {};  // keyed by `${caseName}/${stage}`
 let typingTimer = null;
 let currentNoteView = 'summary';
 let fullNoteHtml = '';
@@ -14,9 +16,17 @@ async function loadCase(caseName) {
   // Stop any in-progress typing
   if (typingTimer) clearTimeout(typingTimer);
 
-  // Fetch case data
-  const resp = await fetch(`cases/${caseName}.json`);
-  currentCase = await resp.json();
+  // Fetch the manifest, then the chart and first stage together.
+  // Later stages are fetched in the background while the first one types.
+  currentCaseName = caseName;
+  const manifest = await fetchChunk(caseName, 'manifest.json');
+  const [chartChunk] = await Promise.all([
+    loadChunk(caseName, manifest.chunks.chart),
+    loadStageText(caseName, manifest, manifest.stages[0]),
+  ]);
+  if (caseName !== currentCaseName) return;
+  currentCase = manifest;
+  manifest.stages.slice(1).forEach(stage => loadStageText(caseName, manifest, stage));
 
   // Show consult banner
   const banner = document.getElementById('consult-banner');
@@ -27,7 +37,7 @@ async function loadCase(caseName) {
   document.getElementById('demo').style.display = 'block';
 
   // Render chart
-  renderChart(currentCase.chart, currentCase.chart_text);
+  renderChart(chartChunk.chart, chartChunk.chart_text);
 
   // Render key findings banner
   renderKeyFindings(currentCase.key_findings);
@@ -40,12 +50,64 @@ async function loadCase(caseName) {
   // Reset and start agent output
   resetStages();
   showStage('triage');
-  typeStage('triage', currentCase.stages.triage);
+  typeStage('triage', await loadStageText(caseName, manifest, 'triage'));
 
   // Scroll to demo
   banner.scrollIntoView({ behavior: 'smooth', block: 'start' });
 }
 
+async function fetchChunk(caseName, path) {
+  const url = `cases/${caseName}/${path}`;
+  const resp = await fetch(url);
+  if (!resp.ok) throw new Error(`Failed to load ${url}: ${resp.status}`);
+  return resp.json();
+}
+
+// Load a manifest chunk, preferring its .gz variant where the browser can
+// decompress it (static hosts like GitHub Pages don't negotiate encodings).
+// Falls back to the plain .json if the variant is missing, fails to decode,
+// or doesn't match the manifest's sha256.
+async function loadChunk(caseName, chunk) {
+  const gz = chunk.encodings && chunk.encodings.gzip;
+  if (gz && typeof DecompressionStream !== 'undefined') {
+    try {
+      return await fetchGzipChunk(`cases/${caseName}/${gz.path}`, chunk.sha256);
+    } catch (err) {
+      console.warn(`Falling back to ${chunk.path}:`, err);
+    }
+  }
+  return fetchChunk(caseName, chunk.path);
+}
+
+async function fetchGzipChunk(url, sha256) {
+  const resp = await fetch(url);
+  if (!resp.ok) throw new Error(`Failed to load ${url}: ${resp.status}`);
+  const stream = resp.body.pipeThrough(new DecompressionStream('gzip'));
+  const data = await new Response(stream).arrayBuffer();
+  // crypto.subtle is only available in secure contexts; skip the check elsewhere.
+  if (sha256 && window.crypto && crypto.subtle) {
+    const digest = new Uint8Array(await crypto.subtle.digest('SHA-256', data));
+    const hex = Array.from(digest, b => b.toString(16).padStart(2, '0')).join('');
+    if (hex !== sha256) throw new Error(`Checksum mismatch for ${url}`);
+  }
+  return JSON.parse(new TextDecoder().decode(data));
+}
+
+// Fetch a stage's text once per case; repeat calls reuse the same request.
+// Keyed by case so a slow response for one case can't be reused by another.
+function loadStageText(caseName, manifest, stage) {
+  const key = `${caseName}/${stage}`;
+  if (!stageRequests[key]) {
+    stageRequests[key] = loadChunk(caseName, manifest.chunks[stage])
+      .then(chunk => chunk.text)
+      .catch(err => {
+        delete stageRequests[key];  // allow a retry on the next click
+        throw err;
+      });
+  }
+  return stageRequests[key];
+}
+
 
 // --- Key Findings Banner ---
 function renderKeyFindings(kf) {
@@ -237,9 +299,13 @@ function typeStage(stageName, text) {
       const nextIdx = stages.indexOf(stageName) + 1;
       if (nextIdx < stages.length && currentCase) {
         const nextStage = stages[nextIdx];
-        setTimeout(() => {
+        const caseName = currentCaseName;
+        const nextText = loadStageText(caseName, currentCase, nextStage);
+        setTimeout(async () => {
+          const text = await nextText;
+          if (caseName !== currentCaseName) return;
           showStage(nextStage);
-          typeStage(nextStage, currentCase.stages[nextStage]);
+          typeStage(nextStage, text);
         }, 800);
       }
     }